@@ -1,18 +1,49 @@
+import asyncio
 import subprocess
-import time
 from datetime import datetime
 import re
-import os
-import tempfile
 import argparse
+import shlex
+import sys
 
 # Configuration
 SESSION = "ollama-agents"
 PANE_MAN = "0.0"
 PANE_WOMAN = "0.1"
-LINES = 300
+LINES = 300  # Most scrollback ever captured from a pane
+CAPTURE_LINES = 80  # Scrollback captured per pane until a response turns out to need more
+TAIL_LINES = 40  # Scrollback compared while waiting for a pane's output to settle
 PROMPT_MARKER = ">>> Send a message"
+_MARKER_B = PROMPT_MARKER.encode()  # For counting prompts in raw capture-pane output
+MAX_POLL_SECS = 2.0  # Slowest poll interval while a model is still generating
+SETTLE_POLL_SECS = 0.1  # Poll interval once a new prompt has appeared
 THINK_END_MARKER = "</think>"
+# Text after the first "👨 Him:" prefix, or after the first "👩 Her:" if there is no "Him" one
+_PREFIX_RE = re.compile(r"(?:.*?👨 Him:|.*?👩 Her:)(.*)")
+TMUX_TIMEOUT = 10.0  # Seconds before a hung tmux command is given up on
+MULTI_SEPARATOR = "::tmux-multi-boundary::"  # Printed between chained commands' outputs
+
+# ANSI color codes
+RED = "\033[91m"
+GREEN = "\033[92m"
+YELLOW = "\033[93m"
+BLUE = "\033[94m"
+PURPLE = "\033[95m"
+CYAN = "\033[96m"
+WHITE = "\033[97m"
+GREY = "\033[90m"  # Light grey
+RESET = "\033[0m"
+RESET_NL = RESET + "\n"
+_COLORS = {  # Color names accepted by log()
+    "red": RED,
+    "green": GREEN,
+    "yellow": YELLOW,
+    "blue": BLUE,
+    "purple": PURPLE,
+    "cyan": CYAN,
+    "white": WHITE,
+    "grey": GREY,
+}
 
 # Command line arguments
 parser = argparse.ArgumentParser(description="Run a text message conversation simulation between two AI agents.")
@@ -48,46 +79,105 @@ ROLE_WOMAN_TEMPLATE = (
 last_sender = "M"  # M for Man, W for Woman
 last_response = ""
 topic = ""  # Will be set based on user input
+control = None  # TmuxControl client, connected once the session exists
+prompt_counts = {PANE_MAN: 0, PANE_WOMAN: 0}  # Prompts each pane showed before its pending reply
+capture_limits = {}  # Scrollback captured per pane, raised when a response does not fit
 
-def print_colored(text, color="green"):
+def print_colored(text, prefix=GREEN):
     """
     Print text with ANSI color codes.
     
     Args:
         text (str): The text to print.
-        color (str): Color name (red, green, yellow, blue, etc.)
-    """
-    colors = {
-        "red": "\033[91m",
-        "green": "\033[92m",
-        "yellow": "\033[93m",
-        "blue": "\033[94m",
-        "purple": "\033[95m",
-        "cyan": "\033[96m",
-        "white": "\033[97m",
-        "grey": "\033[90m",  # Light grey
-        "reset": "\033[0m"
-    }
-    print(f"{colors.get(color, '')}{text}{colors['reset']}")
+        prefix (str): ANSI color code to print before the text (RED, GREEN, YELLOW, BLUE, etc.)
+    """
+    sys.stdout.write(prefix)
+    sys.stdout.write(text)
+    sys.stdout.write(RESET_NL)
 
 def log(msg, color=None, force_show=False):
     """
     Log a message with a timestamp.
     
     Args:
-        msg (str): The message to log.
-        color (str, optional): Color to use for the message.
+        msg (str | Callable[[], str]): The message to log, or a function returning it. A function
+                                       is only called when the message is actually shown, which
+                                       keeps costly formatting off the path when verbose mode is off.
+        color (str, optional): Color name (red, green, grey, etc.) to use for the message.
         force_show (bool, optional): Show the message even when verbose mode is off.
     """
     global args
     if not args or args.verbose or force_show:
+        if callable(msg):
+            msg = msg()
         timestamp = datetime.now().strftime("[%H:%M:%S]")
         if color:
-            print_colored(f"{timestamp} {msg}", color)
+            print_colored(f"{timestamp} {msg}", _COLORS.get(color, ""))
         else:
             print(f"{timestamp} {msg}")
 
-def tmux_session_exists(name: str) -> bool:
+async def tmux_run(cmd: list[str], capture_stdout=False, stdin_data=None,
+                   timeout=TMUX_TIMEOUT) -> subprocess.CompletedProcess:
+    """
+    Run a one-shot tmux command without blocking the event loop.
+    
+    Every tmux process goes through here, so stdout is either captured or discarded,
+    stderr is always discarded, and no command can hang the script indefinitely.
+    
+    Args:
+        cmd (list[str]): The tmux command and its arguments (e.g., ["has-session", "-t", SESSION]).
+        capture_stdout (bool, optional): If True, capture the command's stdout. Defaults to False.
+        stdin_data (bytes, optional): Data to feed to the command's stdin. Defaults to None.
+        timeout (float, optional): Seconds before the command is killed. Defaults to TMUX_TIMEOUT.
+        
+    Returns:
+        subprocess.CompletedProcess: The return code and captured stdout (bytes) of the command.
+                                     A killed command has a negative return code and no output.
+    """
+    proc = await asyncio.create_subprocess_exec(
+        "tmux", *cmd,
+        stdin=asyncio.subprocess.PIPE if stdin_data is not None else None,
+        stdout=asyncio.subprocess.PIPE if capture_stdout else asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.DEVNULL)
+    try:
+        # communicate() drains the pipe while waiting, so a large capture cannot deadlock
+        stdout, _ = await asyncio.wait_for(proc.communicate(stdin_data), timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        log(f"⚠️ tmux {cmd[0]} timed out after {timeout}s", "red")
+        stdout = b"" if capture_stdout else None
+    return subprocess.CompletedProcess(["tmux", *cmd], proc.returncode, stdout)
+
+async def tmux_multi(cmds: list[list[str]]) -> list[bytes]:
+    """
+    Run several tmux commands at once and return what each of them printed.
+    
+    The commands are pipelined over the control-mode client when it is connected.
+    Otherwise they are chained with ";" into a single tmux process, with a separator
+    line printed between them so their outputs can be told apart.
+    
+    Args:
+        cmds (list[list[str]]): The tmux commands, each with its arguments.
+        
+    Returns:
+        list[bytes]: The output of each command, empty for a command that failed.
+    """
+    if control and control.alive():
+        outputs = await control.commands(cmds)
+        if outputs is not None:
+            return [output or b"" for output in outputs]
+    argv = []
+    for cmd in cmds:
+        if argv:
+            argv += [";", "display-message", "-p", MULTI_SEPARATOR, ";"]
+        argv += cmd
+    result = await tmux_run(argv, capture_stdout=True)
+    outputs = result.stdout.split(MULTI_SEPARATOR.encode() + b"\n")
+    # tmux stops at the first failing command, so pad for any that did not run
+    return outputs + [b""] * (len(cmds) - len(outputs))
+
+async def tmux_session_exists(name: str) -> bool:
     """
     Check if a tmux session with the given name exists.
     
@@ -97,10 +187,193 @@ def tmux_session_exists(name: str) -> bool:
     Returns:
         bool: True if the session exists, False otherwise.
     """
-    return subprocess.run(["tmux", "has-session", "-t", name],
-                          stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode == 0
+    return (await tmux_run(["has-session", "-t", name])).returncode == 0
+
+class TmuxControl:
+    """
+    A long-lived tmux control-mode client attached to a session.
 
-def bootstrap_tmux(force=False):
+    Commands are written to the client's stdin and their replies are read back (as raw
+    bytes) from the %begin/%end blocks on its stdout, so polling a pane does not fork a
+    new tmux process. %output notifications are tracked per pane, which lets callers tell
+    whether a pane has changed since it was last captured.
+    """
+
+    def __init__(self, session: str, timeout=TMUX_TIMEOUT):
+        """
+        Prepare a control-mode client for a tmux session. Call start() to attach it.
+
+        Args:
+            session (str): The name of the tmux session.
+            timeout (float, optional): Seconds to wait for each command reply. Defaults to TMUX_TIMEOUT.
+        """
+        self.session = session
+        self.timeout = timeout
+        self.replies = asyncio.Queue()
+        self.lock = asyncio.Lock()
+        self.changed_panes = set()
+        self.pane_ids = {}
+        self.proc = None
+        self.reader = None
+
+    async def start(self):
+        """
+        Attach the control-mode client and start reading its events.
+        """
+        # %output lines can be long, so raise the default 64 KiB line limit
+        self.proc = await asyncio.create_subprocess_exec(
+            "tmux", "-C", "attach-session", "-t", self.session,
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL, limit=2**20)
+        self.reader = asyncio.create_task(self._read_events())
+
+    async def _read_events(self):
+        """
+        Parse the control-mode protocol from the client's stdout until it exits.
+        """
+        begin = None
+        block = []
+        while True:
+            try:
+                line = await self.proc.stdout.readline()
+            except ValueError:
+                break
+            if not line:
+                break
+            line = line.rstrip(b"\n")
+            if begin is not None:
+                # A block ends with %end/%error carrying the same time, number and flags
+                if line.startswith((b"%end ", b"%error ")) and line.split(b" ", 1)[1] == begin:
+                    # Only commands sent by this client (flags 1) have someone waiting
+                    if begin.endswith(b" 1"):
+                        self.replies.put_nowait((line.startswith(b"%end "), b"\n".join(block)))
+                    begin = None
+                else:
+                    block.append(line)
+            elif line.startswith(b"%begin "):
+                begin = line.split(b" ", 1)[1]
+                block = []
+            elif line.startswith(b"%output "):
+                self.changed_panes.add(line.split(b" ", 2)[1].decode())
+            elif line.startswith(b"%exit"):
+                break
+        # Wake up anyone still waiting for a reply
+        self.replies.put_nowait((False, b""))
+
+    def alive(self) -> bool:
+        """
+        Check whether the control-mode client is still running.
+
+        Returns:
+            bool: True if the client process has not exited, False otherwise.
+        """
+        return self.proc is not None and self.proc.returncode is None and not self.reader.done()
+
+    async def command(self, *cmd: str) -> bytes | None:
+        """
+        Run a tmux command through the control-mode client.
+
+        Args:
+            *cmd (str): The tmux command and its arguments (e.g., "capture-pane", "-p").
+
+        Returns:
+            bytes | None: What the command printed, or None if it failed.
+        """
+        outputs = await self.commands([list(cmd)])
+        return outputs[0] if outputs else None
+
+    async def commands(self, cmds: list[list[str]]) -> list[bytes | None] | None:
+        """
+        Run several tmux commands through the control-mode client in one round trip.
+
+        All commands are written at once and their replies are then read back in order.
+
+        Args:
+            cmds (list[list[str]]): The tmux commands, each with its arguments.
+
+        Returns:
+            list[bytes | None] | None: What each command printed (None for a command that
+                                       failed), or None if the client stopped responding.
+        """
+        async with self.lock:
+            try:
+                self.proc.stdin.write("".join(
+                    " ".join(shlex.quote(arg) for arg in cmd) + "\n" for cmd in cmds).encode())
+                await self.proc.stdin.drain()
+                replies = [await asyncio.wait_for(self.replies.get(), self.timeout) for _ in cmds]
+            except asyncio.TimeoutError:
+                # A late reply would be mistaken for the next one, so give up on the client.
+                # Caught first because it is a subclass of OSError on Python 3.11+.
+                self.proc.kill()
+                return None
+            except OSError:
+                return None
+        return [output if ok else None for ok, output in replies]
+
+    async def pane_id(self, pane: str) -> str | None:
+        """
+        Resolve a pane identifier (e.g., "0.0") to tmux's unique pane id (e.g., "%0").
+
+        Args:
+            pane (str): The identifier of the tmux pane (e.g., "0.0").
+
+        Returns:
+            str | None: The unique pane id, or None if it could not be resolved.
+        """
+        if pane not in self.pane_ids:
+            output = await self.command("display-message", "-p", "-t", f"{self.session}:{pane}", "#{pane_id}")
+            if not output:
+                return None
+            self.pane_ids[pane] = output.decode().strip()
+        return self.pane_ids[pane]
+
+    async def has_changed(self, pane: str) -> bool:
+        """
+        Check whether a pane has printed anything since it was last captured.
+
+        Args:
+            pane (str): The identifier of the tmux pane (e.g., "0.0").
+
+        Returns:
+            bool: True if the pane produced output (or its id is unknown), False otherwise.
+        """
+        pane_id = await self.pane_id(pane)
+        return pane_id is None or pane_id in self.changed_panes
+
+    async def capture_pane(self, pane: str, lines: int) -> bytes | None:
+        """
+        Capture the output of a tmux pane without spawning a tmux process.
+
+        Args:
+            pane (str): The identifier of the tmux pane (e.g., "0.0").
+            lines (int): How many lines of scrollback to include.
+
+        Returns:
+            bytes | None: The raw pane output, or None if the capture failed.
+        """
+        # Clear the flag before capturing so output arriving mid-capture marks it again
+        self.changed_panes.discard(await self.pane_id(pane))
+        return await self.command("capture-pane", "-p", "-t", f"{self.session}:{pane}", "-S", f"-{lines}")
+
+    async def close(self):
+        """
+        Detach the control-mode client.
+        """
+        if self.proc is None:
+            return
+        if self.proc.returncode is None:
+            try:
+                self.proc.stdin.close()
+            except OSError:
+                pass
+            try:
+                await asyncio.wait_for(self.proc.wait(), self.timeout)
+            except asyncio.TimeoutError:
+                self.proc.kill()
+                await self.proc.wait()
+        await self.reader
+
+async def bootstrap_tmux(force=False):
     """
     Bootstrap a tmux session with panes for multiple Ollama models.
     
@@ -111,26 +384,27 @@ def bootstrap_tmux(force=False):
         force (bool, optional): If True, kill any existing session with the same name.
                                If False, skip bootstrap if session exists. Defaults to False.
     """
-    if tmux_session_exists(SESSION):
+    if await tmux_session_exists(SESSION):
         if force:
-            subprocess.run(["tmux", "kill-session", "-t", SESSION])
+            await tmux_run(["kill-session", "-t", SESSION])
         else:
             log(f"⚠️ Session '{SESSION}' already exists. Skipping bootstrap.", "grey")
             return
 
     log("🛠️ Bootstrapping tmux session and launching models...", "grey")
-    subprocess.run(["tmux", "new-session", "-d", "-s", SESSION])
+    await tmux_run(["new-session", "-d", "-s", SESSION])
     
     # Create horizontal split (top/bottom) instead of vertical (left/right)
-    subprocess.run(["tmux", "split-window", "-v", "-t", SESSION])
+    await tmux_run(["split-window", "-v", "-t", SESSION])
     
     # Start Gemma in both panes with different roles
-    subprocess.run(["tmux", "send-keys", "-t", f"{SESSION}:0.0", "ollama run gemma3:4b", "C-m"])
-    subprocess.run(["tmux", "send-keys", "-t", f"{SESSION}:0.1", "ollama run gemma3:4b", "C-m"])
+    await asyncio.gather(
+        tmux_run(["send-keys", "-t", f"{SESSION}:0.0", "ollama run gemma3:4b", "C-m"]),
+        tmux_run(["send-keys", "-t", f"{SESSION}:0.1", "ollama run gemma3:4b", "C-m"]))
     log("✅ Models launched. Waiting 2 seconds for them to initialize...", "green")
-    time.sleep(2)
+    await asyncio.sleep(2)
 
-def send_to_pane(pane: str, message: str):
+async def send_to_pane(pane: str, message: str):
     """
     Send a message to a tmux pane.
     
@@ -142,101 +416,200 @@ def send_to_pane(pane: str, message: str):
     
     # For very long or complex messages, fall back to the buffer method
     if len(message) > 1000 or '\n' in message:
-        # Create a temporary file for the message
-        with tempfile.NamedTemporaryFile(mode='w+', delete=False) as temp:
-            temp_path = temp.name
-            temp.write(message)
+        # Use tmux load-buffer and paste-buffer for reliable sending of multiline content
+        log(f"📤 Using buffer method for long/complex message", "grey")
         
-        try:
-            # Use tmux load-buffer and paste-buffer for reliable sending of multiline content
-            log(f"📤 Using buffer method for long/complex message", "grey")
-            
-            # Load the message into tmux buffer
-            subprocess.run(["tmux", "load-buffer", temp_path], 
-                          stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            
-            # Paste the buffer into the target pane
-            subprocess.run(["tmux", "paste-buffer", "-t", f"{SESSION}:{pane}"],
-                          stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        finally:
-            # Clean up the temporary file
-            try:
-                os.unlink(temp_path)
-            except:
-                pass
+        # Pipe the message into the tmux buffer (no temp file) and paste it into the target
+        # pane in one call; the trailing newline is pasted as Enter
+        await tmux_run(["load-buffer", "-", ";", "paste-buffer", "-t", f"{SESSION}:{pane}"],
+                       stdin_data=(message + "\n").encode("utf-8"))
     else:
-        # Use send-keys with literal flag for simpler messages
+        # Use send-keys with literal flag for simpler messages, chained with the Enter key
         log(f"📤 Using direct send-keys for simple message", "grey")
-        subprocess.run(["tmux", "send-keys", "-l", "-t", f"{SESSION}:{pane}", message],
-                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if message.endswith(";"):
+            # tmux would read a trailing ";" as a command separator, so escape it
+            message = message[:-1] + "\\;"
+        await tmux_run(["send-keys", "-l", "-t", f"{SESSION}:{pane}", message, ";",
+                        "send-keys", "-t", f"{SESSION}:{pane}", "C-m"])
+
+async def get_pane_output(pane: str, lines=LINES) -> bytes:
+    """
+    Get the current output of a tmux pane, without decoding it.
+    
+    Args:
+        pane (str): The identifier of the tmux pane (e.g., "0.0").
+        lines (int, optional): How many lines of scrollback to include. Defaults to LINES.
+        
+    Returns:
+        bytes: The raw pane output as printed by capture-pane.
+    """
+    if control and control.alive():
+        output = await control.capture_pane(pane, lines)
+        if output is not None:
+            return output
+    result = await tmux_run(["capture-pane", "-pt", f"{SESSION}:{pane}", "-S", f"-{lines}"],
+                            capture_stdout=True)
+    return result.stdout
+
+async def get_pane_tail(pane: str, n=TAIL_LINES) -> bytes:
+    """
+    Get the visible output of a tmux pane plus only a short stretch of its scrollback.
     
-    # Send an Enter key to submit the message
-    subprocess.run(["tmux", "send-keys", "-t", f"{SESSION}:{pane}", "C-m"],
-                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    Args:
+        pane (str): The identifier of the tmux pane (e.g., "0.0").
+        n (int, optional): How many lines of scrollback to include. Defaults to TAIL_LINES.
+        
+    Returns:
+        bytes: The raw pane output, good enough to tell whether the pane has changed.
+    """
+    return await get_pane_output(pane, n)
 
-def get_pane_output(pane: str) -> list[str]:
+def pane_tail_lines(output: bytes, n: int | None = TAIL_LINES) -> list[str]:
     """
-    Get the current output of a tmux pane.
+    Decode only the last lines of raw pane output.
+    
+    Args:
+        output (bytes): The raw pane output.
+        n (int | None, optional): How many lines to decode, or None for all of them.
+                                  Defaults to TAIL_LINES.
+        
+    Returns:
+        list[str]: The last n lines of the output, ignoring trailing blank lines.
+    """
+    output = output.strip()
+    if not output:
+        return []
+    raw_lines = output.split(b"\n") if n is None else output.rsplit(b"\n", n)[-n:]
+    return [line.decode("utf-8", errors="replace") for line in raw_lines]
+
+def capture_lines(pane: str) -> int:
+    """
+    Get how many lines of scrollback to capture from a pane.
     
     Args:
         pane (str): The identifier of the tmux pane (e.g., "0.0").
         
     Returns:
-        list[str]: The output as a list of lines.
+        int: CAPTURE_LINES, or more if an earlier response from the pane did not fit.
     """
-    result = subprocess.run(["tmux", "capture-pane", "-pt", f"{SESSION}:{pane}", "-S", f"-{LINES}"],
-                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
-    return result.stdout.strip().splitlines()
+    return capture_limits.get(pane, CAPTURE_LINES)
 
-def count_prompts(lines: list[str]) -> int:
+def count_prompts(output: bytes) -> int:
     """
-    Count how many prompt markers appear in the given lines.
+    Count how many prompt markers appear in raw pane output.
     
     Args:
-        lines (list[str]): A list of text lines.
+        output (bytes): The raw pane output.
         
     Returns:
-        int: The number of lines containing the prompt marker.
+        int: The number of prompt markers in the output.
     """
-    return sum(1 for line in lines if PROMPT_MARKER in line)
+    # PROMPT_MARKER is ASCII, so one bytes scan counts it without decoding the output
+    return output.count(_MARKER_B)
 
-def wait_for_prompt(pane: str, base_prompt_count: int, settle_loops=3, sleep_secs=1.0) -> list[str]:
+async def wait_for_prompt(pane: str, base_prompt_count: int, settle_loops=3, sleep_secs=1.0) -> bytes:
     """
     Wait for a new prompt to appear in a tmux pane.
     
     This function continuously checks the output of a tmux pane until a new prompt appears
-    and the output stabilizes (stops changing).
+    and the output stabilizes (stops changing). Only the tail of the pane is compared while
+    it settles; the full scrollback is captured once more when it is returned. While the
+    model is still generating, the interval between checks backs off up to MAX_POLL_SECS;
+    once the new prompt shows up it drops to SETTLE_POLL_SECS so the settle is confirmed
+    quickly.
     
     Args:
         pane (str): The identifier of the tmux pane (e.g., "0.0").
         base_prompt_count (int): The baseline number of prompts to compare against.
         settle_loops (int, optional): Number of consecutive stable checks required. Defaults to 3.
-        sleep_secs (float, optional): Time to sleep between checks. Defaults to 1.0.
+        sleep_secs (float, optional): Initial time to sleep between checks. Defaults to 1.0.
         
     Returns:
-        list[str]: The stabilized output as a list of lines.
+        bytes: The stabilized raw pane output.
     """
     stable_count = 0
-    last_output = []
+    last_tail = None
+    prompt_seen = False
 
     log(f"⏳ Waiting for new >>> prompt in pane {pane}...", "grey")
 
     while True:
-        lines = get_pane_output(pane)
-        current_prompt_count = count_prompts(lines)
-
-        if current_prompt_count > base_prompt_count:
-            if lines == last_output:
-                stable_count += 1
-                if stable_count >= settle_loops:
-                    return lines
-            else:
+        if not prompt_seen:
+            output = await get_pane_output(pane, capture_lines(pane))
+            if count_prompts(output) <= base_prompt_count:
+                await asyncio.sleep(sleep_secs)
+                sleep_secs = min(sleep_secs * 1.5, MAX_POLL_SECS)
+                continue
+            prompt_seen = True
+
+        # An unchanged pane cannot have settled any differently, so skip the capture
+        if last_tail is not None and control and control.alive() and not await control.has_changed(pane):
+            tail = last_tail
+        else:
+            tail = await get_pane_tail(pane)
+
+        if tail == last_tail:
+            stable_count += 1
+            if stable_count >= settle_loops:
+                output = await get_pane_output(pane, capture_lines(pane))
+                if count_prompts(output) > base_prompt_count:
+                    return output
+                # The prompt went away again, so go back to waiting for one
+                prompt_seen = False
                 stable_count = 0
-                last_output = lines
+                last_tail = None
+                continue
+        else:
+            stable_count = 0
+            last_tail = tail
+        await asyncio.sleep(SETTLE_POLL_SECS)
 
-        time.sleep(sleep_secs)
+def is_ready(output: bytes, sent_text: str) -> bool:
+    """
+    Check whether a pane shows a prompt after the text sent to it, i.e. its model has
+    processed that text and is ready for input.
+    
+    Args:
+        output (bytes): The raw pane output.
+        sent_text (str): The text last sent to the pane (e.g., the role instructions).
+        
+    Returns:
+        bool: True if a prompt marker follows the echo of the sent text, False otherwise.
+    """
+    # The start of the text is short enough to be echoed on a single line
+    echo_idx = output.rfind(sent_text[:20].encode("utf-8"))
+    return echo_idx >= 0 and output.rfind(_MARKER_B) > echo_idx
 
-def extract_response(lines: list[str]) -> str:
+async def wait_ready_parallel(targets: list[tuple[str, str, str]], sleep_secs=0.5) -> list[bytes]:
+    """
+    Wait until several tmux panes are all ready for input, checking them side by side.
+    
+    Each check captures every pane that is not ready yet with a single tmux_multi() call,
+    and a pane drops out of the checks as soon as it is ready.
+    
+    Args:
+        targets (list[tuple[str, str, str]]): For each pane, its identifier (e.g., "0.0"), the
+                                              message to log once it is ready, and the text
+                                              last sent to it.
+        sleep_secs (float, optional): Time to sleep between checks. Defaults to 0.5.
+        
+    Returns:
+        list[bytes]: The raw output of each pane at the moment it became ready.
+    """
+    pending = {pane: (ready_msg, sent_text) for pane, ready_msg, sent_text in targets}
+    ready_outputs = {}
+    while pending:
+        await asyncio.sleep(sleep_secs)
+        outputs = await tmux_multi([["capture-pane", "-p", "-t", f"{SESSION}:{pane}", "-S", f"-{LINES}"]
+                                    for pane in pending])
+        for (pane, (ready_msg, sent_text)), output in zip(list(pending.items()), outputs):
+            if is_ready(output, sent_text):
+                log(ready_msg, "grey")
+                ready_outputs[pane] = output
+                del pending[pane]
+    return [ready_outputs[pane] for pane, _, _ in targets]
+
+def extract_response(lines: list[str], require_start=False) -> str:
     """
     Extract the model's response from tmux pane output.
     
@@ -246,69 +619,56 @@ def extract_response(lines: list[str]) -> str:
     
     Args:
         lines (list[str]): The output lines from a tmux pane.
+        require_start (bool, optional): If True, give up when there is no >>> marker before the
+                                        prompt instead of starting at the top of the lines.
+                                        Defaults to False.
         
     Returns:
         str: The extracted response, or an empty string if no response could be extracted.
     """
-    # Find the indices of prompt markers (lines containing ">>> Send a message")
-    prompt_indices = [i for i, line in enumerate(lines) if PROMPT_MARKER in line]
-    
-    if not prompt_indices:
+    # Find the last prompt marker (a line containing ">>> Send a message"), scanning
+    # backwards since it is near the bottom of the pane
+    last_prompt_idx = -1
+    for i in range(len(lines) - 1, -1, -1):
+        if PROMPT_MARKER in lines[i]:
+            last_prompt_idx = i
+            break
+    
+    if last_prompt_idx < 0:
         return ""
     
-    # Get the last prompt index
-    last_prompt_idx = prompt_indices[-1]
-    
-    # Find all command markers (lines starting with ">>>")
-    command_markers = [i for i in range(last_prompt_idx) if i > 0 and 
-                      lines[i].strip().startswith(">>>")]
-    
-    # Filter out the prompt markers from command markers
-    command_markers = [i for i in command_markers if PROMPT_MARKER not in lines[i]]
-    
-    if len(command_markers) < 1:
-        # No command markers found, use beginning of visible text
-        start_idx = 0
+    # Find the most recent command marker (a line starting with ">>>") before the prompt,
+    # or use the beginning of the visible text if there is none
+    start_idx = 0
+    for i in range(last_prompt_idx - 1, 0, -1):
+        if lines[i].lstrip().startswith(">>>") and PROMPT_MARKER not in lines[i]:
+            start_idx = i + 1
+            break
     else:
-        # Get the most recent command marker before the prompt
-        start_idx = max(marker for marker in command_markers if marker < last_prompt_idx) + 1
-    
-    # Extract lines between the last command marker and the prompt
-    response_lines = lines[start_idx:last_prompt_idx]
-    
-    # Skip empty lines at the beginning
-    while response_lines and not response_lines[0].strip():
-        response_lines.pop(0)
-    
-    # Skip empty lines at the end
-    while response_lines and not response_lines[-1].strip():
-        response_lines.pop()
+        if require_start:
+            return ""
+    
+    # Extract lines between the last command marker and the prompt,
+    # skipping empty lines at the beginning and at the end
+    i, j = start_idx, last_prompt_idx
+    while i < j and not lines[i].strip():
+        i += 1
+    while j > i and not lines[j - 1].strip():
+        j -= 1
+    response_lines = lines[i:j]
     
     # Process the lines to extract content after the prefixes and remove continuation markers
     cleaned_lines = []
-    found_prefix = False
-    actual_response = []
     
     # First, join all lines to handle cases where the prefix is split across lines
-    full_text = " ".join([line.strip() for line in response_lines])
-    
-    # Look for the prefixes in the full text
-    him_prefix_pos = full_text.find("👨 Him:")
-    her_prefix_pos = full_text.find("👩 Her:")
-    
-    if him_prefix_pos >= 0:
-        # Extract everything after "👨 Him:"
-        extracted_text = full_text[him_prefix_pos + len("👨 Him:"):].strip()
-        found_prefix = True
-    elif her_prefix_pos >= 0:
-        # Extract everything after "👩 Her:"
-        extracted_text = full_text[her_prefix_pos + len("👩 Her:"):].strip()
-        found_prefix = True
-    
-    if found_prefix:
+    full_text = " ".join(line.strip() for line in response_lines)
+    
+    # Extract everything after "👨 Him:" (or, failing that, "👩 Her:") in a single match
+    match = _PREFIX_RE.match(full_text)
+    
+    if match:
         # Remove any continuation markers
-        extracted_text = extracted_text.replace("...", " ")
-        return extracted_text
+        return match.group(1).strip().replace("...", " ")
     else:
         # Process the original response if no prefix is found
         for i, line in enumerate(response_lines):
@@ -320,7 +680,7 @@ def extract_response(lines: list[str]) -> str:
         # Join the remaining lines to form the response
         return "".join(cleaned_lines)
 
-def relay_response(from_pane, to_pane, from_name, sender_flag):
+async def relay_response(from_pane, to_pane, from_name, sender_flag):
     """
     Relay a response from one model to another.
     
@@ -334,13 +694,25 @@ def relay_response(from_pane, to_pane, from_name, sender_flag):
         sender_flag (str): The flag to set for last_sender after relaying.
     """
     global last_response, last_sender
-    base_prompt_count = count_prompts(get_pane_output(from_pane))
+    base_prompt_count = prompt_counts[from_pane]
     
     log(f"🔄 Waiting for response from {from_name} (current prompt count: {base_prompt_count})", "grey")
-    lines = wait_for_prompt(from_pane, base_prompt_count)
+    output = await wait_for_prompt(from_pane, base_prompt_count)
+    prompt_counts[from_pane] = count_prompts(output)
+    # capture-pane returns the requested scrollback plus the visible screen, so decode all of it
+    lines = pane_tail_lines(output, None)
     log(f"📝 Got {len(lines)} lines of output from {from_name}", "grey")
     
-    response = extract_response(lines)
+    response = extract_response(lines, require_start=True)
+    if not response and count_prompts(output) and capture_lines(from_pane) < LINES:
+        # The response started above the captured scrollback, so capture more from now on
+        capture_limits[from_pane] = min(capture_lines(from_pane) * 2, LINES)
+        log(f"🔍 Widening capture of pane {from_pane} to {capture_limits[from_pane]} lines", "grey")
+        output = await get_pane_output(from_pane, capture_lines(from_pane))
+        lines = pane_tail_lines(output, None)
+        response = extract_response(lines, require_start=True)
+    if not response:
+        response = extract_response(lines)
     
     if not response:
         log(f"⚠️ Could not extract response from {from_name}", "red")
@@ -353,91 +725,109 @@ def relay_response(from_pane, to_pane, from_name, sender_flag):
     # Use colors appropriate for each agent
     color = "blue" if from_name.startswith("👨") else "green"
     log(f"{from_name} ➤", color, force_show=True)
-    print_colored(response, color)
+    print_colored(response, _COLORS[color])
     print()  # Add an empty line for better readability
     
     # Log the exact content being sent for debugging
-    log(f"📤 Sending to other agent (length: {len(response)}, lines: {response.count('\n')+1})", "grey")
+    log(lambda: f"📤 Sending to other agent (length: {len(response)}, lines: {response.count(chr(10)) + 1})", "grey")
     
     # Send the response as a single message
-    send_to_pane(to_pane, response)
+    await send_to_pane(to_pane, response)
+    # Typing into the pane replaces its idle prompt until the model replies
+    prompt_counts[to_pane] -= 1
     last_response = response
     last_sender = sender_flag
 
-def cleanup_tmux():
+async def cleanup_tmux():
     """
-    Kill the tmux session if it exists.
+    Detach the control-mode client and kill the tmux session if it exists.
     """
-    if tmux_session_exists(SESSION):
+    global control
+    if control:
+        await control.close()
+        control = None
+    if await tmux_session_exists(SESSION):
         log(f"🧹 Cleaning up tmux session '{SESSION}'...", "grey")
-        subprocess.run(["tmux", "kill-session", "-t", SESSION], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        await tmux_run(["kill-session", "-t", SESSION])
     else:
         log(f"No tmux session '{SESSION}' to clean up.", "grey")
 
-def main():
+async def run(scenario: str):
     """
-    Main function to run the text message conversation conversation between two AI models.
+    Run the text message conversation between two AI models on the event loop.
     
     This function bootstraps the tmux session, initializes the models with their roles,
     and has the man agent initiate the conversation.
+    
+    Args:
+        scenario (str): The scenario for both agents to role-play.
     """
-    global last_sender, last_response, topic, args
+    global last_sender, last_response, topic, control
     try:
-        # Parse command-line arguments
-        args = parser.parse_args()
-        # Prompt the user for a scenario
-        print_colored("Welcome to AI text message conversation Simulator!", "cyan")
-        scenario = input("Enter a scenario for them to role-play (e.g., 'planning a first date', 'discussing weekend plans'): ").strip()
-        if not scenario:
-            scenario = "meeting for coffee after matching on a dating app"  # Default if nothing entered
-            print_colored(f"No scenario provided, using default: {scenario}", "grey")
-        else:
-            print_colored(f"Starting a text message conversation with this scenario: {scenario}!", "green")
         # Format the role prompts with the chosen scenario
         ROLE_MAN = ROLE_MAN_TEMPLATE.format(scenario=scenario)
         ROLE_WOMAN = ROLE_WOMAN_TEMPLATE.format(scenario=scenario)
-        bootstrap_tmux(force=False)
+        await bootstrap_tmux(force=False)
+        control = TmuxControl(SESSION)
+        await control.start()
         log(f"💕 Setting up a text message conversation with scenario: {scenario}...", "grey")
         # Send role instructions to both agents
-        send_to_pane(PANE_MAN, ROLE_MAN)
-        send_to_pane(PANE_WOMAN, ROLE_WOMAN)
-        time.sleep(5)
-        # Wait for both models to be ready before starting the conversation
+        await send_to_pane(PANE_MAN, ROLE_MAN)
+        await send_to_pane(PANE_WOMAN, ROLE_WOMAN)
+        # Wait for both models to answer their role instructions before starting the conversation
         log("⏳ Waiting for both personas to be ready...", "grey")
-        # Wait for the man model to be ready
-        log("⏳ Waiting for the man to be ready...", "grey")
-        while True:
-            lines = get_pane_output(PANE_MAN)
-            if any(PROMPT_MARKER in line for line in lines):
-                log("✅ Man is ready to start the conversation.", "grey")
-                break
-            time.sleep(1)
-        # Wait for the woman model to be ready
-        log("⏳ Waiting for the woman to be ready...", "grey")
-        while True:
-            lines = get_pane_output(PANE_WOMAN)
-            if any(PROMPT_MARKER in line for line in lines):
-                log("✅ Woman is ready to receive the conversation.", "grey")
-                break
-            time.sleep(1)
+        man_output, woman_output = await wait_ready_parallel([
+            (PANE_MAN, "✅ Man is ready to start the conversation.", ROLE_MAN),
+            (PANE_WOMAN, "✅ Woman is ready to receive the conversation.", ROLE_WOMAN)])
+        prompt_counts[PANE_MAN] = count_prompts(man_output)
+        prompt_counts[PANE_WOMAN] = count_prompts(woman_output)
         log("📱 text message conversation is connecting...", "grey")
         # Have the man initiate the conversation naturally
         log(f"👨 Man is starting the conversation about {scenario}...", "grey")
-        send_to_pane(PANE_MAN, f"Start the text message conversation about this scenario: {scenario}.")
+        await send_to_pane(PANE_MAN, f"Start the text message conversation about this scenario: {scenario}.")
+        prompt_counts[PANE_MAN] -= 1
         # Wait for the man's first message and send it to the woman
-        relay_response(PANE_MAN, PANE_WOMAN, "👨 Him", "W")
+        await relay_response(PANE_MAN, PANE_WOMAN, "👨 Him", "W")
         # Main conversation loop
         while True:
             try:
                 if last_sender == "M":
-                    relay_response(PANE_MAN, PANE_WOMAN, "👨 Him", "W")
+                    await relay_response(PANE_MAN, PANE_WOMAN, "👨 Him", "W")
                 else:
-                    relay_response(PANE_WOMAN, PANE_MAN, "👩 Her", "M")
-            except KeyboardInterrupt:
+                    await relay_response(PANE_WOMAN, PANE_MAN, "👩 Her", "M")
+            except (KeyboardInterrupt, asyncio.CancelledError):
+                # asyncio.run() turns Ctrl+C into a cancellation of main()
                 log("👋 text message conversation ended.", "grey")
                 break
     finally:
-        cleanup_tmux()
+        await cleanup_tmux()
+
+def main():
+    """
+    Main function to run the text message conversation conversation between two AI models.
+    
+    The scenario is read before the event loop starts, since asyncio.run() turns Ctrl+C
+    into a task cancellation that a blocking input() call would never see.
+    """
+    global args
+    # Parse command-line arguments
+    args = parser.parse_args()
+    # Prompt the user for a scenario
+    print_colored("Welcome to AI text message conversation Simulator!", CYAN)
+    try:
+        scenario = input("Enter a scenario for them to role-play (e.g., 'planning a first date', 'discussing weekend plans'): ").strip()
+    except KeyboardInterrupt:
+        asyncio.run(cleanup_tmux())
+        raise
+    if not scenario:
+        scenario = "meeting for coffee after matching on a dating app"  # Default if nothing entered
+        print_colored(f"No scenario provided, using default: {scenario}", GREY)
+    else:
+        print_colored(f"Starting a text message conversation with this scenario: {scenario}!", GREEN)
+    asyncio.run(run(scenario))
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    except KeyboardInterrupt:
+        pass